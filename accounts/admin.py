@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from accounts.models import AllowedEmail, EmailOTP, AccessLog, RevokedToken
+from accounts.paginator import LargeTablePaginator
 
 
 class AllowedEmailAdmin(admin.ModelAdmin):
@@ -15,6 +16,8 @@ class EmailOTPAdmin(admin.ModelAdmin):
     list_filter = ('used',)
     search_fields = ('email',)
     ordering = ('-created_at',)
+    paginator = LargeTablePaginator
+    show_full_result_count = False
 
 
 class AccessLogAdmin(admin.ModelAdmin):
@@ -23,8 +26,11 @@ class AccessLogAdmin(admin.ModelAdmin):
         'status_code', 'token_jti',
     )
     list_filter = ('status_code',)
+    list_select_related = ('allowed_email',)
     search_fields = ('allowed_email__email', 'path', 'method', 'query_string',)
     ordering = ('-started_at',)
+    paginator = LargeTablePaginator
+    show_full_result_count = False
 
 
 class RevokedTokenAdmin(admin.ModelAdmin):
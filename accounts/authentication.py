@@ -1,10 +1,25 @@
 # accounts/authentication.py
+import time
+from functools import lru_cache
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken
 from accounts.models import AllowedEmail  # ← your model
 
+# How long a cached AllowedEmail lookup may be reused (bounds staleness after deactivation)
+ALLOWED_EMAIL_CACHE_SECONDS = 30
+
+
+@lru_cache(maxsize=4096)
+def _fetch_allowed(allowed_email_id, email, epoch_bucket):
+    # epoch_bucket is only part of the cache key, so entries roll over every ALLOWED_EMAIL_CACHE_SECONDS
+    return AllowedEmail.objects.only("id", "email", "is_active", "created_at").get(
+        id=allowed_email_id,
+        email=email,
+        is_active=True
+    )
+
 
 class CustomJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
@@ -30,11 +45,8 @@ class CustomJWTAuthentication(JWTAuthentication):
         allowed_email_obj = None
         if email and allowed_email_id:
             try:
-                allowed_email_obj = AllowedEmail.objects.get(
-                    id=allowed_email_id,
-                    email__iexact=email,
-                    is_active=True
-                )
+                epoch_bucket = int(time.time() // ALLOWED_EMAIL_CACHE_SECONDS)
+                allowed_email_obj = _fetch_allowed(allowed_email_id, email, epoch_bucket)
             except (AllowedEmail.DoesNotExist, ValueError):
                 pass
 
@@ -0,0 +1,17 @@
+import redis
+from django.core.management.base import BaseCommand
+
+from accounts.revocation import seed_from_db
+
+
+class Command(BaseCommand):
+    help = "Copy unexpired RevokedToken rows into the redis revocation set (run on each release)."
+
+    def handle(self, *args, **options):
+        try:
+            seeded = seed_from_db()
+        except redis.RedisError as exc:
+            # is_revoked keeps checking the DB until a seed succeeds, so don't fail the release over it
+            self.stderr.write(f"Warning: could not seed revoked tokens into redis: {exc}")
+            return
+        self.stdout.write(f"Seeded {seeded} revoked token(s) into redis.")
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-15 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="accesslog",
+            index=models.Index(
+                fields=["allowed_email", "-started_at"],
+                name="accounts_ac_allowed_96776a_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-15 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_accesslog_allowed_email_started_at_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="emailotp",
+            index=models.Index(
+                condition=models.Q(("used", False)),
+                fields=["email", "-created_at"],
+                name="emailotp_active_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-15 07:01
+
+from django.db import migrations
+from django.db.models.functions import Lower
+
+
+def lowercase_emails(apps, schema_editor):
+    AllowedEmail = apps.get_model("accounts", "AllowedEmail")
+    EmailOTP = apps.get_model("accounts", "EmailOTP")
+
+    existing = set(AllowedEmail.objects.values_list("email", flat=True))
+    for allowed in AllowedEmail.objects.exclude(email=Lower("email")):
+        lowered = allowed.email.lower()
+        # leave mixed-case duplicates of an existing address for manual cleanup
+        if lowered in existing:
+            continue
+        allowed.email = lowered
+        allowed.save(update_fields=["email"])
+        existing.add(lowered)
+
+    EmailOTP.objects.exclude(email=Lower("email")).update(email=Lower("email"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0003_emailotp_active_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-15 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_lowercase_emails"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="revokedtoken",
+            index=models.Index(
+                fields=["expires_at"], name="accounts_re_expires_816e5b_idx"
+            ),
+        ),
+    ]
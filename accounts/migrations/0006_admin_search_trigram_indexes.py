@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-15 07:03
+
+from django.db import migrations
+
+# Admin search runs `icontains`, which Django compiles to UPPER(col::text) LIKE UPPER(%term%)
+# on Postgres, so the trigram indexes are built on that same expression.
+TRIGRAM_INDEXES = [
+    ("accesslog_path_trgm", "accounts_accesslog", "path"),
+    ("accesslog_query_string_trgm", "accounts_accesslog", "query_string"),
+    ("allowedemail_email_trgm", "accounts_allowedemail", "email"),
+    ("emailotp_email_trgm", "accounts_emailotp", "email"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0005_revokedtoken_expires_at_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 
 
@@ -13,6 +14,18 @@ class AllowedEmail(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def clean(self):
+        # lowercase before ModelForm's unique check, so "A@x.com" is reported as a duplicate of "a@x.com"
+        if self.email:
+            self.email = self.email.lower()
+
+    def save(self, *args, **kwargs):
+        # stored lowercase so lookups can use exact matches on the unique index; also covers
+        # writes that skip clean() (shell, scripts, objects.create)
+        if self.email:
+            self.email = self.email.lower()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.email
 
@@ -33,6 +46,8 @@ class EmailOTP(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["email", "-created_at"]),
+            # only live OTPs; serves the "latest unused OTP" lookup in verify_otp
+            models.Index(fields=["email", "-created_at"], condition=Q(used=False), name="emailotp_active_idx"),
         ]
 
     def is_expired(self):
@@ -64,6 +79,9 @@ class AccessLog(models.Model):
 
     class Meta:
         ordering = ["-started_at"]
+        indexes = [
+            models.Index(fields=["allowed_email", "-started_at"]),
+        ]
 
     def __str__(self):
         return f"{self.allowed_email} {self.method} {self.path} @ {self.started_at}"
@@ -79,5 +97,10 @@ class RevokedToken(models.Model):
     revoked_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(null=True, blank=True)  # store original expiry for cleanup
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["expires_at"]),
+        ]
+
     def __str__(self):
         return f"Revoked {self.jti}"
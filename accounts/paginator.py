@@ -0,0 +1,40 @@
+from django.core.paginator import Paginator
+from django.db import OperationalError, connections, transaction
+from django.utils.functional import cached_property
+
+
+class LargeTablePaginator(Paginator):
+    """
+    Paginator for large, append-heavy tables (used by the admin changelists).
+    On Postgres the COUNT(*) is bounded by a statement_timeout; if it does not finish
+    in time we fall back to the planner estimate (pg_class.reltuples) for unfiltered
+    lists, or a large placeholder count for filtered ones.
+    """
+    count_timeout_ms = 200
+    fallback_count = 9999999999
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return super().count
+
+        try:
+            with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout TO %s", [self.count_timeout_ms])
+                return queryset.count()
+        except OperationalError:
+            pass
+
+        if not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return int(row[0])
+
+        return self.fallback_count
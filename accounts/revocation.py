@@ -0,0 +1,73 @@
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+from accounts.models import RevokedToken
+
+KEY_PREFIX = "auth:revoked:"
+# set (without expiry) once seed_from_db has copied the table; while it is missing, redis may have been
+# flushed or evicted, so a missing jti key proves nothing and is_revoked asks the DB instead
+SEEDED_KEY = f"{KEY_PREFIX}__seeded__"
+# fail fast so an unreachable redis falls back to the DB instead of waiting on the OS TCP timeout
+SOCKET_TIMEOUT_SECONDS = 0.25
+
+_client = None
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.CELERY_BROKER_URL or "redis://localhost:6379/0",
+            socket_connect_timeout=SOCKET_TIMEOUT_SECONDS,
+            socket_timeout=SOCKET_TIMEOUT_SECONDS,
+        )
+    return _client
+
+
+def revoke(jti: str, ttl: int):
+    """
+    Mark a token jti as revoked in redis until it would have expired anyway (ttl in seconds).
+    The RevokedToken table stays the durable record, so redis errors are not fatal here.
+    """
+    if ttl <= 0:
+        return
+    try:
+        _get_client().setex(f"{KEY_PREFIX}{jti}", ttl, "1")
+    except redis.RedisError:
+        pass
+
+
+def is_revoked(jti: str):
+    try:
+        revoked, seeded = _get_client().mget(f"{KEY_PREFIX}{jti}", SEEDED_KEY)
+    except redis.RedisError:
+        # redis unavailable: fall back to the DB table
+        return RevokedToken.objects.filter(jti=jti).exists()
+    if revoked is not None:
+        return True
+    if seeded is not None:
+        return False
+    # redis not (or no longer) seeded: only the DB table is authoritative
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def seed_from_db():
+    """
+    Copy still-live RevokedToken rows into redis, e.g. tokens revoked before redis held them.
+    Rows without expires_at get the refresh lifetime counted from revoked_at, an upper bound
+    on when the token expires. Sets SEEDED_KEY last, so is_revoked trusts redis only after a
+    complete copy. Returns the number of jtis written.
+    """
+    lifetime = settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"]
+    now = timezone.now()
+    pipe = _get_client().pipeline(transaction=False)
+    seeded = 0
+    for jti, revoked_at, expires_at in RevokedToken.objects.values_list("jti", "revoked_at", "expires_at").iterator():
+        ttl = int(((expires_at or revoked_at + lifetime) - now).total_seconds())
+        if ttl > 0:
+            pipe.setex(f"{KEY_PREFIX}{jti}", ttl, "1")
+            seeded += 1
+    pipe.set(SEEDED_KEY, "1")
+    pipe.execute()
+    return seeded
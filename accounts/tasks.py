@@ -0,0 +1,65 @@
+import os
+import threading
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from sib_api_v3_sdk import Configuration, ApiClient, TransactionalEmailsApi, SendSmtpEmail
+from sib_api_v3_sdk.rest import ApiException
+
+from accounts.models import RevokedToken
+
+_brevo_api = None
+_brevo_api_lock = threading.Lock()
+
+
+def _get_brevo_api():
+    """
+    Build the Brevo client once per process so its HTTP connection pool is reused across sends.
+    """
+    global _brevo_api
+    if _brevo_api is None:
+        with _brevo_api_lock:
+            if _brevo_api is None:
+                # Configure API client with your Brevo API key
+                configuration = Configuration()
+                configuration.api_key['api-key'] = os.environ.get('BREVO_API_KEY')
+                _brevo_api = TransactionalEmailsApi(ApiClient(configuration))
+    return _brevo_api
+
+
+@shared_task(bind=True, autoretry_for=(ApiException,), retry_backoff=True, max_retries=3)
+def send_otp_email_task(self, email, otp):
+    """
+    Send the OTP email through Brevo.
+    Transient Brevo API errors are retried with exponential backoff.
+    """
+    # Prepare email data
+    subject = "Your login OTP"
+    expires_min = int(getattr(settings, "OTP_EXPIRY_SECONDS", 300) / 60)
+    message = f"Your OTP: {otp}. Expires in {expires_min} minute(s)."
+
+    # Define the email payload
+    send_smtp_email = SendSmtpEmail(
+        to=[{"email": email}],
+        sender={
+            "name": os.environ.get("DEFAULT_FROM_NAME", "YourAppName"),
+            "email": os.environ.get("DEFAULT_FROM_EMAIL")
+        },
+        subject=subject,
+        text_content=message,
+        # Optionally, use html_content for HTML emails
+        # html_content=f"<p>Your OTP: <strong>{otp}</strong>. Expires in {expires_min} minute(s).</p>"
+    )
+
+    # Send the email
+    _get_brevo_api().send_transac_email(send_smtp_email)
+
+
+@shared_task
+def purge_revoked_tokens():
+    """
+    Delete revoked-token rows whose original token has expired (scheduled hourly via celery beat).
+    """
+    deleted, _ = RevokedToken.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
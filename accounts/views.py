@@ -1,16 +1,22 @@
-import jwt
+import hmac
+
+from django.db import transaction
+from django.db.models import Count, Window
 from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import ExpiredTokenError, TokenError
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.conf import settings
 
 from .serializers import RequestOTPSerializer, VerifyOTPSerializer, RefreshSerializer, AccessLogSerializer, \
     LogoutSerializer
 from .models import AllowedEmail, EmailOTP, RevokedToken, AccessLog
+from .revocation import is_revoked, revoke
 from .utils import generate_plain_otp, hmac_hash_otp, send_otp_email, make_jwt_tokens_for_allowed_email
 
 
@@ -30,7 +36,7 @@ class AccountViewSet(viewsets.ViewSet):
         email = serializer.validated_data["email"].lower()
 
         try:
-            allowed = AllowedEmail.objects.get(email__iexact=email, is_active=True)
+            allowed = AllowedEmail.objects.get(email=email, is_active=True)
         except AllowedEmail.DoesNotExist:
             return Response({"detail": "Email not registered for access."}, status=status.HTTP_403_FORBIDDEN)
 
@@ -38,14 +44,14 @@ class AccountViewSet(viewsets.ViewSet):
         otp_hash_val = hmac_hash_otp(otp_plain)
         expiry = timezone.now() + timedelta(seconds=getattr(settings, "OTP_EXPIRY_SECONDS", 300))
 
-        # cleanup previous unused OTPs (optional)
-        EmailOTP.objects.filter(email__iexact=email, used=False).delete()
-
-        EmailOTP.objects.create(email=email, otp_hash=otp_hash_val, expires_at=expiry)
+        # invalidate previous unused OTPs (kept for audit) and store the new one
+        with transaction.atomic():
+            EmailOTP.objects.filter(email=email, used=False).update(used=True)
+            EmailOTP.objects.create(email=email, otp_hash=otp_hash_val, expires_at=expiry)
 
         print("DEFAULT_FROM_EMAIL:", settings.DEFAULT_FROM_EMAIL)
 
-        # send OTP (sync; queue in prod)
+        # send OTP (queued on Celery)
         send_otp_email(email, otp_plain)
 
         return Response({"detail": "OTP sent to email."}, status=status.HTTP_200_OK)
@@ -58,11 +64,11 @@ class AccountViewSet(viewsets.ViewSet):
         otp = serializer.validated_data["otp"]
 
         try:
-            allowed = AllowedEmail.objects.get(email__iexact=email, is_active=True)
+            allowed = AllowedEmail.objects.get(email=email, is_active=True)
         except AllowedEmail.DoesNotExist:
             return Response({"detail": "Email not registered for access."}, status=status.HTTP_403_FORBIDDEN)
 
-        otp_obj = EmailOTP.objects.filter(email__iexact=email, used=False).order_by("-created_at").first()
+        otp_obj = EmailOTP.objects.filter(email=email, used=False).order_by("-created_at").first()
         if not otp_obj:
             return Response({"detail": "No OTP request found. Request a new OTP."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -72,7 +78,7 @@ class AccountViewSet(viewsets.ViewSet):
         if otp_obj.is_expired():
             return Response({"detail": "OTP expired. Request a new OTP."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if hmac_hash_otp(otp) != otp_obj.otp_hash:
+        if not hmac.compare_digest(hmac_hash_otp(otp), otp_obj.otp_hash):
             otp_obj.attempts += 1
             otp_obj.save(update_fields=["attempts"])
             return Response({"detail": "Invalid OTP."}, status=status.HTTP_400_BAD_REQUEST)
@@ -100,25 +106,25 @@ class AccountViewSet(viewsets.ViewSet):
         serializer.is_valid(raise_exception=True)
         refresh_token = serializer.validated_data["refresh"]
 
-        import jwt
+        # UntypedToken verifies signature, expiry and jti without RefreshToken's blacklist query;
+        # revocation is checked below, so only the token type is left to check here
         try:
-            payload = jwt.decode(refresh_token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        except jwt.ExpiredSignatureError:
+            payload = UntypedToken(refresh_token).payload
+        except ExpiredTokenError:
             return Response({"detail": "Refresh token expired"}, status=status.HTTP_401_UNAUTHORIZED)
-        except jwt.InvalidTokenError:
+        except TokenError:
+            return Response({"detail": "Invalid refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
+        if payload.get("token_type") != RefreshToken.token_type:
             return Response({"detail": "Invalid refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
-
-        if payload.get("type") != "refresh":
-            return Response({"detail": "Invalid token type"}, status=status.HTTP_400_BAD_REQUEST)
 
         # check revocation
         jti = payload.get("jti")
-        if jti and RevokedToken.objects.filter(jti=jti).exists():
+        if jti and is_revoked(jti):
             return Response({"detail": "Refresh token revoked"}, status=status.HTTP_401_UNAUTHORIZED)
 
         # validate allowed email exists & active
         try:
-            allowed = AllowedEmail.objects.get(id=payload.get("allowed_email_id"), email__iexact=payload.get("email"),
+            allowed = AllowedEmail.objects.get(id=payload.get("allowed_email_id"), email=payload.get("email"),
                                                is_active=True)
         except AllowedEmail.DoesNotExist:
             return Response({"detail": "No such allowed email"}, status=status.HTTP_401_UNAUTHORIZED)
@@ -141,8 +147,8 @@ class AccountViewSet(viewsets.ViewSet):
             token_payload = getattr(request, "token_payload", None)
             if token_payload:
                 try:
-                    allowed = AllowedEmail.objects.get(id=token_payload.get("allowed_email_id"),
-                                                       email__iexact=token_payload.get("email"))
+                    allowed = AllowedEmail.objects.only("id", "email", "is_active", "created_at").get(
+                        id=token_payload.get("allowed_email_id"), email=token_payload.get("email"))
                 except AllowedEmail.DoesNotExist:
                     allowed = None
 
@@ -150,17 +156,23 @@ class AccountViewSet(viewsets.ViewSet):
             return Response({"detail": "Allowed email not found"}, status=status.HTTP_401_UNAUTHORIZED)
 
         # compute last login (last request start time) from AccessLog
-        last_log = AccessLog.objects.filter(allowed_email=allowed).order_by("-started_at").first()
-        total_requests = AccessLog.objects.filter(allowed_email=allowed).count()
+        # single query: latest row plus the total count via a window over the user's logs
+        last_log = (
+            AccessLog.objects.filter(allowed_email=allowed)
+            .annotate(total=Window(expression=Count("id")))
+            .order_by("-started_at")
+            .values("started_at", "path", "total")
+            .first()
+        )
 
         data = {
             "email": allowed.email,
             "allowed_email_id": str(allowed.id),
             "is_active": allowed.is_active,
             "created_at": allowed.created_at,
-            "last_request_at": last_log.started_at if last_log else None,
-            "last_request_path": last_log.path if last_log else None,
-            "total_requests": total_requests,
+            "last_request_at": last_log["started_at"] if last_log else None,
+            "last_request_path": last_log["path"] if last_log else None,
+            "total_requests": last_log["total"] if last_log else 0,
         }
         return Response(data, status=status.HTTP_200_OK)
 
@@ -177,8 +189,8 @@ class AccountViewSet(viewsets.ViewSet):
             token_payload = getattr(request, "token_payload", None)
             if token_payload:
                 try:
-                    allowed = AllowedEmail.objects.get(id=token_payload.get("allowed_email_id"),
-                                                       email__iexact=token_payload.get("email"))
+                    allowed = AllowedEmail.objects.only("id").get(
+                        id=token_payload.get("allowed_email_id"), email=token_payload.get("email"))
                 except AllowedEmail.DoesNotExist:
                     allowed = None
 
@@ -206,9 +218,9 @@ class AccountViewSet(viewsets.ViewSet):
                 dt = timezone.make_aware(dt, timezone=timezone.get_current_timezone())
             qs = qs.filter(started_at__gte=dt)
 
-        qs = qs[:limit]
-        serializer = AccessLogSerializer(qs, many=True)
-        return Response({"count": qs.count(), "results": serializer.data}, status=status.HTTP_200_OK)
+        results = list(qs[:limit])
+        serializer = AccessLogSerializer(results, many=True)
+        return Response({"count": len(results), "results": serializer.data}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["post"], url_path="logout", permission_classes=[IsAuthenticated],)
     def logout(self, request):
@@ -221,38 +233,31 @@ class AccountViewSet(viewsets.ViewSet):
 
         refresh_token = serializer.validated_data["refresh"]
 
+        # UntypedToken verifies signature, expiry and jti without RefreshToken's blacklist query
         try:
-            payload = jwt.decode(
-                refresh_token,
-                settings.JWT_SECRET,
-                algorithms=[settings.JWT_ALGORITHM],
-            )
-        except jwt.ExpiredSignatureError:
+            payload = UntypedToken(refresh_token).payload
+        except ExpiredTokenError:
             return Response(
                 {"detail": "Refresh token already expired"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        except jwt.InvalidTokenError:
+        except TokenError:
             return Response(
                 {"detail": "Invalid refresh token"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
-        if payload.get("token_type") != "refresh":
+        if payload.get("token_type") != RefreshToken.token_type:
             return Response(
-                {"detail": "Invalid token type"},
+                {"detail": "Invalid refresh token"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        jti = payload.get("jti")
-        if not jti:
-            return Response(
-                {"detail": "Token missing jti"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        jti = payload["jti"]
 
-        # idempotent revoke
-        RevokedToken.objects.get_or_create(jti=jti)
+        # idempotent revoke; expires_at lets the purge task drop the row, the redis entry expires with the token
+        expires_at = datetime.fromtimestamp(payload["exp"], tz=dt_timezone.utc)
+        RevokedToken.objects.get_or_create(jti=jti, defaults={"expires_at": expires_at})
+        revoke(jti, int((expires_at - timezone.now()).total_seconds()))
 
         return Response(
             {"detail": "Logged out successfully"},
@@ -1,6 +1,7 @@
 # yourproject/celery.py
 import os
 from celery import Celery
+from celery.schedules import crontab
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gme_backend.settings')
@@ -17,3 +18,11 @@ app.autodiscover_tasks()
 app.conf.broker_url = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 app.conf.result_backend = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
 app.conf.task_track_started = True
+
+# Periodic tasks (run with `celery -A gme_backend beat`)
+app.conf.beat_schedule = {
+    "purge-revoked-tokens": {
+        "task": "accounts.tasks.purge_revoked_tokens",
+        "schedule": crontab(minute=0),
+    },
+}
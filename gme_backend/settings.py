@@ -252,6 +252,9 @@ CELERY_TIMEZONE = (
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND')
 
+# Uploads above 2.5 MB are written to a temporary file instead of being held in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2_621_440
+
 cloudinary.config(
     cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
     api_key=os.getenv("CLOUDINARY_API_KEY"),
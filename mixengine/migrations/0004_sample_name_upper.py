@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-15 07:13
+
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+
+def fill_name_upper(apps, schema_editor):
+    Sample = apps.get_model("mixengine", "Sample")
+    Sample.objects.filter(name__isnull=False).update(name_upper=Upper("name"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mixengine", "0003_productorder_final_values_productorder_targets_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sample",
+            name="name_upper",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=100, null=True
+            ),
+        ),
+        migrations.RunPython(fill_name_upper, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-15 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mixengine", "0004_sample_name_upper"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="sample",
+            constraint=models.UniqueConstraint(
+                fields=("name", "lot_number"), name="sample_name_lot_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-15 07:21
+
+from django.db import migrations, models
+
+# SampleViewSet search runs `icontains` on name / lot_number, which Django compiles to
+# UPPER(col::text) LIKE UPPER(%term%) on Postgres, so the trigram indexes use that expression.
+TRIGRAM_INDEXES = [
+    ("sample_name_trgm", "mixengine_sample", "name"),
+    ("sample_lot_number_trgm", "mixengine_sample", "lot_number"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mixengine", "0005_sample_name_lot_unique"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sample",
+            index=models.Index(
+                fields=["-last_updated"], name="mixengine_s_last_up_2287f2_idx"
+            ),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
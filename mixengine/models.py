@@ -3,6 +3,7 @@ from django.db import models
 
 class Sample(models.Model):
     name = models.CharField(max_length=100, null=True, blank=True)
+    name_upper = models.CharField(max_length=100, null=True, blank=True, db_index=True, editable=False)  # UPPER(name)
     lot_number = models.CharField(max_length=100, null=True, blank=True)
     production_date = models.DateField(null=True, blank=True)
 
@@ -21,7 +22,18 @@ class Sample(models.Model):
     remaining_quantity = models.FloatField(null=True, blank=True)         # auto-updated
     last_updated = models.DateTimeField(auto_now=True)                    # value change recent date
 
+    class Meta:
+        # (name, lot_number) lookups are served by the unique constraint's index
+        indexes = [
+            models.Index(fields=["-last_updated"]),  # default SampleViewSet ordering
+        ]
+        constraints = [
+            # Uploads upsert on this key (INSERT ... ON CONFLICT on Postgres)
+            models.UniqueConstraint(fields=["name", "lot_number"], name="sample_name_lot_unique"),
+        ]
+
     def save(self, *args, **kwargs):
+        self.name_upper = self.name.upper() if self.name is not None else None
         if self.bags_available is not None and self.used_quantity is not None:
             self.remaining_quantity = self.bags_available - self.used_quantity
         super().save(*args, **kwargs)
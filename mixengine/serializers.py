@@ -2,13 +2,14 @@ from django.db import transaction
 from rest_framework import serializers
 
 from mixengine.models import Sample, ProductOrder, ProductMixResult
-from mixengine.utils.mix_optimizer import optimize_mix, get_closest_feasible_targets
+from mixengine.utils.mix_optimizer import optimize_mix, get_closest_feasible_targets, samples_to_soa, \
+    match_sample_indices
 
 
 class SampleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sample
-        fields = '__all__'
+        exclude = ['name_upper']  # internal lookup column
 
 
 class ProductOrderSerializer(serializers.ModelSerializer):
@@ -17,23 +18,19 @@ class ProductOrderSerializer(serializers.ModelSerializer):
         fields = ['id', 'target_cp', 'total_bags']
 
 
-class ProductOrderDetailSerializer(serializers.ModelSerializer):
+class ProductOrderMixSerializer(serializers.ModelSerializer):
+    """
+    Only the order's mix rows; the retrieve view reads the plain order fields off the instance.
+    """
     mix = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductOrder
-        fields = [
-            'id',
-            'total_bags',
-            'targets',
-            'final_values',
-            'variances',
-            'mix',
-        ]
+        fields = ['mix']
 
     def get_mix(self, obj):
-        qs = ProductMixResult.objects.filter(order=obj)
-        return ProductMixResultSerializer(qs, many=True).data
+        # Uses the 'mix' prefetch from ProductOrderViewSet.get_queryset when present
+        return ProductMixResultSerializer(obj.mix.all(), many=True).data
 
 
 class ProductMixResultSerializer(serializers.ModelSerializer):
@@ -63,9 +60,6 @@ class ProductOrderCreateSerializer(serializers.Serializer):
         if data['total_bags'] <= 0:
             raise serializers.ValidationError("Total bags must be > 0")
 
-        if not Sample.objects.exists():
-            raise serializers.ValidationError("No samples found. Please add sample data first.")
-
         # Ensure at least one target parameter is provided
         if not any([
             data.get("target_cp"),
@@ -80,45 +74,21 @@ class ProductOrderCreateSerializer(serializers.Serializer):
                 "At least one nutritional target (CP, Fat, TVBN, Ash, FFA, Moisture, Fiber) is required."
             )
 
-        # Min/Max validation for nutritional fields
-        field_mapping = {
-            "target_cp": "cp",
-            "target_fat": "fat",
-            "target_tvbn": "tvbn",
-            "target_ash": "ash",
-            "target_ffa": "ffa",
-            "target_moisture": "moisture",
-            "target_fiber": "fiber",
-        }
-
-        for target_field, sample_field in field_mapping.items():
-            target_value = data.get(target_field)
-            if target_value is not None:
-                values = list(
-                    Sample.objects.values_list(sample_field, flat=True).exclude(**{f"{sample_field}__isnull": True})
-                )
-                if values:
-                    min_val, max_val = min(values), max(values)
-                    if target_value < min_val or target_value > max_val:
-                        raise serializers.ValidationError(
-                            f"{target_field.replace('target_', '').upper()} target {target_value} is not achievable. "
-                            f"Available range: {min_val} – {max_val}"
-                        )
-
         data = super().validate(data)
 
+        # Load samples once per request; save() reuses them (and their column arrays) for the optimizer.
+        # An empty list doubles as the "no samples" check, so no separate exists() query is needed.
+        self._samples = list(Sample.objects.all())
+        if not self._samples:
+            raise serializers.ValidationError("No samples found. Please add sample data first.")
+        self._samples_soa = samples_to_soa(self._samples)
+
         # New: Check fixed_samples against remaining_quantity
-        samples = list(Sample.objects.all())
         fixed_samples = data.get('fixed_samples', {}) or {}
         for key, val in fixed_samples.items():
-            if key.upper() == "F/M":
-                matching_indices = [i for i, s in enumerate(samples) if "FISH MEAL" in s.name.upper()]
-            elif key.upper() == "HYPRO":
-                matching_indices = [i for i, s in enumerate(samples) if "HYPRO" in s.name.upper()]
-            else:
-                matching_indices = [i for i, s in enumerate(samples) if key.upper() in s.name.upper()]
+            matching_indices = match_sample_indices(key, self._samples_soa["upper_names"])
             if matching_indices:
-                sum_remaining = sum(max(0, samples[i].remaining_quantity) for i in matching_indices)
+                sum_remaining = float(self._samples_soa["remaining"][matching_indices].sum())
                 if sum_remaining < val:
                     # Don't raise error; we'll handle in save with a message
                     data['insufficient_stock'] = {key: {'required': val, 'available': sum_remaining}}
@@ -141,10 +111,13 @@ class ProductOrderCreateSerializer(serializers.Serializer):
                 "message": "Request can't be completed because " + "; ".join(messages)
             }
 
-        samples = list(Sample.objects.all())
+        samples = getattr(self, '_samples', None)
+        if samples is None:
+            samples = list(Sample.objects.all())
+            self._samples_soa = samples_to_soa(samples)
 
         # Run optimization
-        result = optimize_mix(samples, total_bags, fixed_samples=fixed_samples, **data)
+        result = optimize_mix(self._samples_soa, total_bags, fixed_samples=fixed_samples, **data)
         if not result['success']:
             targets_dict = {
                 k.replace("target_", "").upper(): v
@@ -153,7 +126,7 @@ class ProductOrderCreateSerializer(serializers.Serializer):
             }
 
             recommended = get_closest_feasible_targets(
-                samples,
+                self._samples_soa,
                 total_bags,
                 targets_dict,
                 fixed_samples=fixed_samples
@@ -173,8 +146,12 @@ class ProductOrderCreateSerializer(serializers.Serializer):
             for nutrient, value in recommended.items():
                 recommended_payload[f"target_{nutrient.lower()}"] = value
 
+            # The soft-constraint LP doubles as the achievability check: report how far it got
             raise serializers.ValidationError({
                 "message": "Exact targets not achievable with current stock.",
+                "targets": targets_dict,
+                "final_values": result.get("final_values", {}),
+                "total_violation": result.get("total_violation"),
                 "recommended_payload": recommended_payload
             })
 
@@ -199,19 +176,20 @@ class ProductOrderCreateSerializer(serializers.Serializer):
                 final_values=final_values,
                 variances=variances
             )
-            # Create mix rows + update stock
+            # Create mix rows + update stock (one bulk query each)
+            mix_rows = []
+            used_samples = []
             for i, sample in enumerate(samples):
                 bags_used = result['bags_used'][i]
                 if bags_used > 0:
-                    ProductMixResult.objects.create(
-                        order=order,
-                        sample=sample,
-                        bags_used=bags_used
-                    )
+                    mix_rows.append(ProductMixResult(order=order, sample=sample, bags_used=bags_used))
 
                     sample.used_quantity += bags_used
                     sample.remaining_quantity = sample.bags_available - sample.used_quantity
-                    sample.save(update_fields=["used_quantity", "remaining_quantity"])
+                    used_samples.append(sample)
+
+            ProductMixResult.objects.bulk_create(mix_rows, batch_size=500)
+            Sample.objects.bulk_update(used_samples, ["used_quantity", "remaining_quantity"], batch_size=500)
 
         return {
             "order_id": order.id,
@@ -220,7 +198,7 @@ class ProductOrderCreateSerializer(serializers.Serializer):
             "final_values": final_values,
             "variances": variances,
             "mix": ProductMixResultSerializer(
-                ProductMixResult.objects.filter(order=order),
+                ProductMixResult.objects.filter(order=order).select_related('sample'),
                 many=True
             ).data
         }
@@ -1,9 +1,195 @@
 import os
+import shutil
+import tempfile
+from itertools import islice
+from urllib.request import urlopen
+
 import pandas as pd
 from celery import shared_task
-from django.db import transaction
+from django.db import connection, transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+
 from .models import Sample  # Import your Sample model
 
+REQUIRED_COLUMNS = ['Sample', 'Date', 'Lot.No', 'M', 'CP', 'FAT',
+                    'TVBN', 'Ash', 'FFA', 'Bags', 'Fiber']
+
+NUMERIC_COLUMNS = ['M', 'CP', 'FAT', 'TVBN', 'Ash', 'FFA', 'Bags', 'Fiber']
+
+SAMPLE_CSV_DTYPES = {
+    'Sample': str, 'Date': str,
+    'M': 'float64', 'CP': 'float64', 'FAT': 'float64', 'TVBN': 'float64',
+    'Ash': 'float64', 'FFA': 'float64', 'Fiber': 'float64',
+}
+
+SAMPLE_UPDATE_FIELDS = [
+    'production_date', 'moisture', 'cp', 'fat', 'tvbn', 'ash', 'ffa', 'bags_available', 'fiber',
+    'remaining_quantity', 'last_updated',
+]
+
+_SAMPLE_TABLE = Sample._meta.db_table
+
+# Postgres upsert keyed on the sample_name_lot_unique constraint.
+# New rows start with used_quantity 0, so remaining_quantity is bags_available;
+# updates recompute it from the stored used_quantity, as Sample.save() does.
+# RETURNING (xmax = 0) is true for inserted rows and false for updated ones.
+SAMPLE_UPSERT_SQL = f"""
+    INSERT INTO "{_SAMPLE_TABLE}" (
+        name, name_upper, lot_number, production_date, moisture, cp, fat, tvbn, ash, ffa,
+        bags_available, fiber, used_quantity, remaining_quantity, last_updated
+    )
+    VALUES %s
+    ON CONFLICT (name, lot_number) DO UPDATE SET
+        production_date = EXCLUDED.production_date,
+        moisture = EXCLUDED.moisture,
+        cp = EXCLUDED.cp,
+        fat = EXCLUDED.fat,
+        tvbn = EXCLUDED.tvbn,
+        ash = EXCLUDED.ash,
+        ffa = EXCLUDED.ffa,
+        bags_available = EXCLUDED.bags_available,
+        fiber = EXCLUDED.fiber,
+        remaining_quantity = CASE
+            WHEN EXCLUDED.bags_available IS NOT NULL AND "{_SAMPLE_TABLE}".used_quantity IS NOT NULL
+            THEN EXCLUDED.bags_available - "{_SAMPLE_TABLE}".used_quantity
+            ELSE "{_SAMPLE_TABLE}".remaining_quantity
+        END,
+        last_updated = EXCLUDED.last_updated
+    RETURNING (xmax = 0)
+"""
+
+
+def _upsert_sample_rows_postgres(rows, now):
+    """
+    Upsert parsed sample rows with INSERT ... ON CONFLICT through psycopg2's execute_values,
+    without building a model instance per row. Returns (created, updated).
+    """
+    from psycopg2.extras import execute_values  # Postgres-only path
+
+    # ON CONFLICT cannot update the same row twice in one statement, so keep the last row per key
+    latest = {(row[0], row[1]): row for row in rows}
+    values = [
+        (name, name.upper(), lot_number, production_date, moisture, cp, fat, tvbn, ash, ffa, bags, fiber, 0, bags, now)
+        for name, lot_number, production_date, moisture, cp, fat, tvbn, ash, ffa, bags, fiber in latest.values()
+    ]
+
+    # One transaction per chunk; savepoint=False skips a SAVEPOINT if a caller already opened one
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        inserted = execute_values(cursor.cursor, SAMPLE_UPSERT_SQL, values, page_size=5000, fetch=True)
+
+    created = sum(1 for (is_new,) in inserted if is_new)
+    return created, len(inserted) - created
+
+
+def _upsert_sample_chunk(chunk):
+    """
+    Create or update the Samples in one DataFrame chunk, matched on (name, lot_number).
+    On Postgres this is a single INSERT ... ON CONFLICT (see _upsert_sample_rows_postgres).
+    Elsewhere existing rows are fetched in one query and written back with bulk_create / bulk_update,
+    so a chunk costs a handful of queries instead of two per row.
+    bulk writes skip Sample.save(), so name_upper, remaining_quantity and last_updated are set here.
+    """
+    # CharField stores str(value), so match on the same text form (e.g. numeric lot numbers)
+    names = chunk['Sample'].astype(str).tolist()
+    lot_numbers = chunk['Lot.No'].astype(str).tolist()
+    parsed_dates = pd.to_datetime(chunk['Date'], format='%d.%m.%Y', errors='coerce')
+    production_dates = parsed_dates.dt.date.astype(object).where(parsed_dates.notna(), None).tolist()
+    # Blank cells come through as NaN; store them as NULL rather than NaN
+    values = chunk[NUMERIC_COLUMNS].astype(object)
+    values = values.where(chunk[NUMERIC_COLUMNS].notna(), None)
+    now = timezone.now()
+
+    # plain column lists instead of iterrows(), which builds a Series per row
+    rows = list(zip(
+        names, lot_numbers, production_dates,
+        *(values[col].tolist() for col in NUMERIC_COLUMNS),
+    ))
+    if connection.vendor == 'postgresql':
+        return _upsert_sample_rows_postgres(rows, now)
+
+    # Every column written back is reassigned below, so only the key and used_quantity are read
+    existing = {
+        (s.name, s.lot_number): s
+        for s in Sample.objects.filter(
+            name__in=set(names), lot_number__in=set(lot_numbers)
+        ).only('id', 'name', 'lot_number', 'used_quantity')
+    }
+    to_create = {}
+    to_update = {}
+    created = updated = 0
+
+    for name, lot_number, production_date, moisture, cp, fat, tvbn, ash, ffa, bags, fiber in rows:
+        key = (name, lot_number)
+
+        obj = existing.get(key) or to_create.get(key)
+        if obj is None:
+            obj = Sample(name=name, name_upper=name.upper(), lot_number=lot_number, used_quantity=0)
+            to_create[key] = obj
+            created += 1
+        else:
+            if key in existing:
+                to_update[key] = obj
+            updated += 1
+
+        obj.production_date = production_date
+        obj.moisture = moisture
+        obj.cp = cp
+        obj.fat = fat
+        obj.tvbn = tvbn
+        obj.ash = ash
+        obj.ffa = ffa
+        obj.bags_available = bags
+        obj.fiber = fiber
+        if obj.bags_available is not None and obj.used_quantity is not None:
+            obj.remaining_quantity = obj.bags_available - obj.used_quantity
+        obj.last_updated = now
+
+    with transaction.atomic(savepoint=False):
+        Sample.objects.bulk_create(to_create.values(), batch_size=500)
+        Sample.objects.bulk_update(to_update.values(), SAMPLE_UPDATE_FIELDS, batch_size=500)
+
+    return created, updated
+
+
+def _iter_xlsx_chunks(file_url, chunksize):
+    """
+    Yield the active sheet of an .xlsx file as DataFrames of up to chunksize rows.
+    The workbook is opened in openpyxl read-only mode, so rows are streamed from the file
+    instead of the whole sheet being loaded at once (pd.read_excel has no chunksize).
+    Like usecols on the CSV path, only REQUIRED_COLUMNS are kept.
+    """
+    with tempfile.TemporaryFile() as tmp:
+        # openpyxl needs a seekable file, so spool the download to disk first
+        if os.path.exists(file_url):
+            with open(file_url, 'rb') as src:
+                shutil.copyfileobj(src, tmp)
+        else:
+            with urlopen(file_url) as src:
+                shutil.copyfileobj(src, tmp)
+        tmp.seek(0)
+
+        wb = load_workbook(tmp, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            keep = [i for i, col in enumerate(header) if col in REQUIRED_COLUMNS]
+            columns = [header[i] for i in keep]
+            while True:
+                batch = list(islice(rows, chunksize))
+                if not batch:
+                    break
+                # Formatted but empty rows (common at the end of a sheet) come through as all-None;
+                # pd.read_excel dropped them, so skip them here too
+                values = [[row[i] for i in keep] for row in batch]
+                values = [row for row in values if any(cell is not None for cell in row)]
+                if values:
+                    yield pd.DataFrame(values, columns=columns)
+        finally:
+            wb.close()
+
 
 @shared_task(bind=True)
 def process_sample_upload(self, file_url):
@@ -12,49 +198,40 @@ def process_sample_upload(self, file_url):
     """
     Background task to process the uploaded CSV/Excel file.
     """
-    chunksize = 1000
+    # One transaction per chunk; bulk writes inside it are still split into batches of 500
+    chunksize = 10000
     created = updated = 0
 
     try:
         if file_url.endswith(".csv"):
-            reader = pd.read_csv(file_url, chunksize=chunksize)
+            # Only parse the columns we use, with fixed dtypes instead of per-chunk inference
+            reader = pd.read_csv(
+                file_url,
+                chunksize=chunksize,
+                usecols=lambda col: col in REQUIRED_COLUMNS,
+                dtype=SAMPLE_CSV_DTYPES,
+            )
         elif file_url.endswith(".xlsx"):
-            df = pd.read_excel(file_url)
-            reader = [df]
+            reader = _iter_xlsx_chunks(file_url, chunksize)
         else:
             raise ValueError("Unsupported file format")
 
-        required_columns = ['Sample', 'Date', 'Lot.No', 'M', 'CP', 'FAT',
-                            'TVBN', 'Ash', 'FFA', 'Bags', 'Fiber']
-
         for chunk in reader:
-            if not all(col in chunk.columns for col in required_columns):
-                raise ValueError("Missing required columns.")
-
-            with transaction.atomic():
-                for _, row in chunk.iterrows():
-                    date_value = pd.to_datetime(row['Date'], format='%d.%m.%Y', errors='coerce')
-                    production_date = None if pd.isna(date_value) else date_value.date()
-
-                    obj, is_created = Sample.objects.update_or_create(
-                        name=row['Sample'],
-                        lot_number=row['Lot.No'],
-                        defaults={
-                            'production_date': production_date,
-                            'moisture': row['M'],
-                            'cp': row['CP'],
-                            'fat': row['FAT'],
-                            'tvbn': row['TVBN'],
-                            'ash': row['Ash'],
-                            'ffa': row['FFA'],
-                            'bags_available': row['Bags'],
-                            'fiber': row['Fiber'],
-                        }
-                    )
-                    if is_created:
-                        created += 1
-                    else:
-                        updated += 1
+            missing = set(REQUIRED_COLUMNS).difference(chunk.columns)
+            if missing:
+                # Report every missing column at once, in template order
+                missing = [col for col in REQUIRED_COLUMNS if col in missing]
+                raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+            # A repeated (Sample, Lot.No) in the same chunk would just be overwritten; keep the last one only
+            chunk = chunk.drop_duplicates(subset=['Sample', 'Lot.No'], keep='last').reset_index(drop=True)
+
+            chunk_created, chunk_updated = _upsert_sample_chunk(chunk)
+            created += chunk_created
+            updated += chunk_updated
+
+            # Progress for clients polling the task result
+            self.update_state(state='PROGRESS', meta={'processed': created + updated})
 
         # Clean up the temporary file
         if os.path.exists(file_url):
@@ -1,3 +1,47 @@
+import os
+import tempfile
+
 from django.test import TestCase
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill
+
+from mixengine.models import Sample
+from mixengine.tasks import REQUIRED_COLUMNS, process_sample_upload
+
+
+class SampleUploadXlsxTests(TestCase):
+    def write_xlsx(self, rows, blank_formatted_rows=0):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(REQUIRED_COLUMNS)
+        for row in rows:
+            ws.append(row)
+        # Formatted but empty rows, as Excel leaves them at the end of a sheet
+        fill = PatternFill(fill_type="solid", start_color="FFFF00")
+        for r in range(len(rows) + 2, len(rows) + 2 + blank_formatted_rows):
+            for c in range(1, len(REQUIRED_COLUMNS) + 1):
+                ws.cell(row=r, column=c).fill = fill
+
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        wb.save(path)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        return path
+
+    def test_blank_formatted_rows_are_ignored(self):
+        path = self.write_xlsx(
+            [
+                ["Fish Meal Local", "23.12.2025", "FM-2025-001", 10.2, 64.5, 11.8, 135.0, 19.5, 9.2, 80, 1.8],
+                ["Hypro Fish", "20.12.2025", "HYPRO-DEC01", 9.8, 70.0, 15.0, 100.0, 16.0, 5.0, 50, 1.0],
+            ],
+            blank_formatted_rows=5,
+        )
+
+        result = process_sample_upload.apply(args=[path]).get()
 
-# Create your tests here.
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(
+            sorted(Sample.objects.values_list("name", flat=True)),
+            ["Fish Meal Local", "Hypro Fish"],
+        )
+        self.assertFalse(Sample.objects.filter(remaining_quantity__isnull=True).exists())
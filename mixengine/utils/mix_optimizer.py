@@ -1,4 +1,5 @@
 from scipy.optimize import linprog
+from scipy.sparse import csr_matrix, identity, hstack as sparse_hstack, vstack as sparse_vstack
 import numpy as np
 
 FOOD_TOLERANCES = {
@@ -12,122 +13,165 @@ FOOD_TOLERANCES = {
 }
 
 
-def optimize_mix(samples, total_bags, fixed_samples=None, **targets):
+NUTRIENT_FIELDS = ("moisture", "cp", "fat", "tvbn", "ash", "ffa", "fiber")
+
+
+def samples_to_soa(samples):
+    """
+    Convert Sample instances into column arrays in a single pass, so the optimizer never touches
+    model attributes again. Returns one float array per nutrient (NULL -> nan), "remaining"
+    (remaining_quantity clamped at 0) and "upper_names" (Sample.name_upper) for fixed_samples matching.
+    """
+    upper_names = []
+    rows = []
+    for s in samples:
+        upper_names.append(s.name_upper or "")
+        rows.append((s.moisture, s.cp, s.fat, s.tvbn, s.ash, s.ffa, s.fiber, s.remaining_quantity))
+
+    columns = np.array(rows, dtype=float).reshape(len(rows), len(NUTRIENT_FIELDS) + 1).T
+    samples_soa = dict(zip(NUTRIENT_FIELDS, columns))
+    samples_soa["remaining"] = np.maximum(columns[-1], 0)
+    samples_soa["upper_names"] = upper_names
+    return samples_soa
+
+
+def match_sample_indices(key, upper_names):
+    """
+    Indices of the samples a fixed_samples key refers to.
+    "F/M" selects fish meal lots, any other key is a case-insensitive substring of the name.
+    """
+    token = key.upper()
+    if token == "F/M":
+        token = "FISH MEAL"
+    return [i for i, name in enumerate(upper_names) if token in name]
+
+
+def _bounds(bag_limits, n_extra=0):
+    """(lower, upper) bounds: x_i in [0, bag_limit_i], then n_extra unbounded-above vars >= 0."""
+    bounds = np.zeros((len(bag_limits) + n_extra, 2))
+    bounds[:len(bag_limits), 1] = bag_limits
+    bounds[len(bag_limits):, 1] = np.inf
+    return bounds
+
+
+def _equality_constraints(n, n_vars, fixed_groups, total_bags):
+    """
+    Sparse A_eq/b_eq for: all bags sum to total_bags, plus one row per fixed group
+    (sum of the group's bags == its fixed amount). fixed_groups is [(indices, bags), ...].
+    """
+    rows = [0] * n
+    cols = list(range(n))
+    for row, (indices, _) in enumerate(fixed_groups, start=1):
+        rows.extend([row] * len(indices))
+        cols.extend(indices)
+    A_eq = csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(1 + len(fixed_groups), n_vars))
+    b_eq = np.array([total_bags] + [bags for _, bags in fixed_groups], dtype=float)
+    return A_eq, b_eq
+
+
+def _soft_nutrient_constraints(values_matrix, upper, lower, total_bags):
+    """
+    Sparse A_ub/b_ub for soft nutrient bounds, with variables [x (n), viol_upper (m), viol_lower (m)]:
+        V @ x - viol_upper <= upper * total_bags
+       -V @ x - viol_lower <= -lower * total_bags
+    """
+    m, n = values_matrix.shape
+    V = csr_matrix(values_matrix)
+    A_ub = sparse_hstack([sparse_vstack([V, -V]), -identity(2 * m)], format="csr")
+    b_ub = np.concatenate((upper * total_bags, -lower * total_bags))
+    return A_ub, b_ub
+
+
+def _saturated_allocation(n, fixed_groups, bag_limits, total_bags):
+    """
+    When disjoint fixed groups already add up to total_bags, the equality constraints pin every
+    other sample to 0. Spread each group's bags over its members in proportion to their bag_limits
+    (never above a limit, since fixed amounts are capped at the group's remaining stock).
+    Returns None when this shortcut does not apply.
+    """
+    if not fixed_groups or not np.isclose(sum(bags for _, bags in fixed_groups), total_bags):
+        return None
+    members = [i for indices, _ in fixed_groups for i in indices]
+    if len(members) != len(set(members)):
+        return None  # overlapping groups, leave it to the LP
+
+    x = np.zeros(n)
+    for indices, bags in fixed_groups:
+        group_limit = bag_limits[indices].sum()
+        if group_limit <= 0:
+            if bags > 0:
+                return None
+            continue
+        x[indices] = bags * bag_limits[indices] / group_limit
+    return x
+
+
+def optimize_mix(samples_soa, total_bags, fixed_samples=None, **targets):
     """
     Optimization for nutritional accuracy with soft constraints.
+    - samples_soa is the column-array form of the samples (see samples_to_soa).
     - Always returns a feasible solution by minimizing violations beyond tolerances.
     - If perfect match within tolerances, violations = 0.
     - Pre-checks for target achievability ignored since soft constraints handle it.
     """
     fixed_samples = fixed_samples or {}
-    n = len(samples)
+    n = len(samples_soa["remaining"])
     # Map targets to nutrient names (strip 'target_')
     targets = {k.replace("target_", "").lower(): v for k, v in targets.items() if v is not None}
     nutrient_list = list(targets.keys())
     m = len(nutrient_list)
     if m == 0:
-        return basic_mix(samples, total_bags, fixed_samples)
-
-    # Extract values
-    values_dict = {
-        "moisture": [s.moisture for s in samples],
-        "cp": [s.cp for s in samples],
-        "fat": [s.fat for s in samples],
-        "tvbn": [s.tvbn for s in samples],
-        "ash": [s.ash for s in samples],
-        "ffa": [s.ffa for s in samples],
-        "fiber": [s.fiber for s in samples],
-    }
-    values_dict = {k: v for k, v in values_dict.items() if k in nutrient_list}
-    # bag_limits = [s.bags_available for s in samples]
-    bag_limits = [max(0, s.remaining_quantity) for s in samples]
-
-    # Objective: minimize sum of all violations (upper + lower for each nutrient)
-    c = np.zeros(n)  # No cost for x
-    c = np.concatenate((c, np.ones(2 * m)))  # Cost 1 for each viol_upper and viol_lower
+        return basic_mix(samples_soa, total_bags, fixed_samples)
 
-    # Bounds: x_i in [0, bag_limit_i], violations >= 0
-    bounds = [(0, bl) for bl in bag_limits] + [(0, None)] * (2 * m)
-
-    # Equality constraints: total bags + fixed (grouped)
-    A_eq = np.zeros((1, n + 2 * m))
-    A_eq[0, :n] = 1
-    b_eq = [total_bags]
+    bag_limits = samples_soa["remaining"]
 
+    # Fixed groups (grouped equality constraints)
+    fixed_groups = []
     for key, val in fixed_samples.items():
         # Determine matching samples based on key
-        if key.upper() == "F/M":
-            matching_indices = [i for i, s in enumerate(samples) if "FISH MEAL" in s.name.upper()]
-        elif key.upper() == "HYPRO":
-            matching_indices = [i for i, s in enumerate(samples) if "HYPRO" in s.name.upper()]
-        else:
-            matching_indices = [i for i, s in enumerate(samples) if key.upper() in s.name.upper()]
+        matching_indices = match_sample_indices(key, samples_soa["upper_names"])
 
         if matching_indices:
             # Use current remaining quantity (clamped to >=0) instead of original bags_available
-            sum_remaining = sum(bag_limits[i] for i in matching_indices)  # bag_limits already uses remaining_quantity
+            sum_remaining = bag_limits[matching_indices].sum()  # bag_limits already uses remaining_quantity
 
             # Cap the fixed requirement at what's actually available now
             fixed_bags = min(val, sum_remaining)
+            fixed_groups.append((matching_indices, fixed_bags))
+
+    values_matrix = np.vstack([samples_soa[nut] for nut in nutrient_list])
+    t = np.array([targets[nut] for nut in nutrient_list], dtype=float)
+    tols = np.array([FOOD_TOLERANCES.get(nut, 0.5) for nut in nutrient_list])
+    upper = (t + tols) * total_bags
+    lower = (t - tols) * total_bags
+
+    # Fast path: fixed samples already fill total_bags, so no LP is needed as long as the
+    # allocation is fully determined (single-sample groups) or already within tolerance
+    bags_used = _saturated_allocation(n, fixed_groups, bag_limits, total_bags)
+    if bags_used is not None:
+        totals = values_matrix @ bags_used
+        total_violation = (np.maximum(totals - upper, 0) + np.maximum(lower - totals, 0)).sum()
+        if total_violation == 0 or all(len(indices) == 1 for indices, _ in fixed_groups):
+            return _mix_result(values_matrix, nutrient_list, bags_used, total_violation)
 
-            # Create equality constraint row: sum of x_i for matching samples == fixed_bags
-            fixed_row = np.zeros(n + 2 * m)
-            for i in matching_indices:
-                fixed_row[i] = 1
-            A_eq = np.vstack((A_eq, fixed_row))
-            b_eq.append(fixed_bags)
-
-    A_eq = np.array(A_eq)
-    b_eq = np.array(b_eq)
-
-    # Upper and lower soft constraints for each nutrient
-    A_ub = []
-    b_ub = []
-    for j, nutrient in enumerate(nutrient_list):
-        tol = FOOD_TOLERANCES.get(nutrient, 0.5)
-        t = targets[nutrient]
-        v = values_dict[nutrient]
-
-        # Upper: sum(v_i * x_i) - viol_upper_j <= (t + tol) * total_bags
-        upper_row = np.zeros(n + 2 * m)
-        upper_row[:n] = v
-        upper_row[n + j] = -1
-        A_ub.append(upper_row)
-        b_ub.append((t + tol) * total_bags)
-
-        # Lower: -sum(v_i * x_i) - viol_lower_j <= -(t - tol) * total_bags
-        lower_row = np.zeros(n + 2 * m)
-        lower_row[:n] = -np.array(v)
-        lower_row[n + m + j] = -1
-        A_ub.append(lower_row)
-        b_ub.append(-(t - tol) * total_bags)
-
-    A_ub = np.array(A_ub) if A_ub else None
-    b_ub = np.array(b_ub) if b_ub else None
+    # Objective: minimize sum of all violations (upper + lower for each nutrient)
+    c = np.zeros(n)  # No cost for x
+    c = np.concatenate((c, np.ones(2 * m)))  # Cost 1 for each viol_upper and viol_lower
 
-    result = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
+    # Bounds: x_i in [0, bag_limit_i], violations >= 0
+    bounds = _bounds(bag_limits, 2 * m)
 
-    def avg(values, bags_used):
-        total_used = sum(bags_used)
-        if total_used == 0:
-            return 0
-        return sum(values[i] * bags_used[i] for i in range(n)) / total_used
+    # Equality constraints: total bags + fixed (grouped)
+    A_eq, b_eq = _equality_constraints(n, n + 2 * m, fixed_groups, total_bags)
 
-    if result.success:
-        bags_used = result.x[:n]
-        violations = result.x[n:]
-        total_violation = sum(violations)
+    # Upper and lower soft constraints for each nutrient:
+    # sum(v_i * x_i) stays within (t ± tol) * total_bags, beyond that the violation variables take up the slack
+    A_ub, b_ub = _soft_nutrient_constraints(values_matrix, t + tols, t - tols, total_bags)
 
-        final_values = {
-            nut: avg(values_dict[nut], bags_used) for nut in nutrient_list
-        }
+    result = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
 
-        return {
-            "success": total_violation == 0,
-            "bags_used": [round(b, 2) for b in bags_used],
-            "final_values": {k: round(v, 2) for k, v in final_values.items()},
-            "total_violation": round(total_violation, 2)  # Sum of excess deviations (total units)
-        }
+    if result.success:
+        return _mix_result(values_matrix, nutrient_list, result.x[:n], result.x[n:].sum())
     else:
         return {
             "success": False,
@@ -136,31 +180,39 @@ def optimize_mix(samples, total_bags, fixed_samples=None, **targets):
         }
 
 
-def basic_mix(samples, total_bags, fixed_samples):
-    n = len(samples)
+def _mix_result(values_matrix, nutrient_list, bags_used, total_violation):
+    # Weighted average of every nutrient in one matrix-vector product
+    total_used = bags_used.sum()
+    final_values = values_matrix @ bags_used / total_used if total_used else np.zeros(len(nutrient_list))
+
+    return {
+        "success": total_violation == 0,
+        "bags_used": [round(b, 2) for b in bags_used],
+        "final_values": {nut: round(float(v), 2) for nut, v in zip(nutrient_list, final_values)},
+        "total_violation": round(total_violation, 2)  # Sum of excess deviations (total units)
+    }
+
+
+def basic_mix(samples_soa, total_bags, fixed_samples):
+    n = len(samples_soa["remaining"])
     c = np.zeros(n)
-    A_eq = np.ones((1, n))
-    b_eq = [total_bags]
 
-    bag_limits = [max(0, s.remaining_quantity) for s in samples]
-    bounds = [(0, bl) for bl in bag_limits]
+    bag_limits = samples_soa["remaining"]
+    bounds = _bounds(bag_limits)
+    fixed_groups = []
     for key, val in fixed_samples.items():
-        if key.upper() == "F/M":
-            matching = [i for i, s in enumerate(samples) if "FISH MEAL" in s.name.upper()]
-        elif key.upper() == "HYPRO":
-            matching = [i for i, s in enumerate(samples) if "HYPRO" in s.name.upper()]
-        else:
-            matching = [i for i, s in enumerate(samples) if key.upper() in s.name.upper()]
+        matching = match_sample_indices(key, samples_soa["upper_names"])
 
         if matching:
-            sum_remaining = sum(bag_limits[i] for i in matching)
-            fixed_bags = min(val, sum_remaining)
+            sum_remaining = bag_limits[matching].sum()
+            fixed_groups.append((matching, min(val, sum_remaining)))
+
+    # Fixed samples fill total_bags: any allocation inside the groups is a valid answer
+    bags_used = _saturated_allocation(n, fixed_groups, bag_limits, total_bags)
+    if bags_used is not None:
+        return {"success": True, "bags_used": [round(b, 2) for b in bags_used], "final_values": {}, "total_violation": 0}
 
-            fixed_row = np.zeros(n)
-            for i in matching:
-                fixed_row[i] = 1
-            A_eq = np.vstack((A_eq, fixed_row))
-            b_eq.append(fixed_bags)
+    A_eq, b_eq = _equality_constraints(n, n, fixed_groups, total_bags)
 
     result = linprog(c, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
     if result.success:
@@ -169,14 +221,12 @@ def basic_mix(samples, total_bags, fixed_samples):
         return {"success": False, "reason": result.message}
 
 
-def get_achievable_range(samples, nutrient, total_bags):
-    n = len(samples)
-    values = np.array([getattr(s, nutrient) or 0 for s in samples])
-    bag_limits = [max(0, s.remaining_quantity) for s in samples]
+def get_achievable_range(samples_soa, nutrient, total_bags):
+    n = len(samples_soa["remaining"])
+    values = np.nan_to_num(samples_soa[nutrient])
 
-    A_eq = np.ones((1, n))
-    b_eq = np.array([total_bags])
-    bounds = [(0, bl) for bl in bag_limits]
+    A_eq, b_eq = _equality_constraints(n, n, [], total_bags)
+    bounds = _bounds(samples_soa["remaining"])
 
     # Maximize nutrient
     c_max = -values
@@ -195,18 +245,17 @@ def get_achievable_range(samples, nutrient, total_bags):
     return round(max(0, min_val), 2), round(max(0, max_val), 2)
 
 
-def get_closest_feasible_targets(samples, total_bags, targets_dict, fixed_samples=None):
-    n = len(samples)
+def get_closest_feasible_targets(samples_soa, total_bags, targets_dict, fixed_samples=None):
+    n = len(samples_soa["remaining"])
     nutrients = list(targets_dict.keys())
     m = len(nutrients)
 
-    bag_limits = [max(0, s.remaining_quantity) for s in samples]
+    bag_limits = samples_soa["remaining"]
 
-    # Extract nutrient values matrix
-    values_matrix = np.array([
-        [getattr(s, nut.lower()) or 0 for s in samples]
-        for nut in nutrients
-    ])
+    # Extract nutrient values matrix (missing values count as 0)
+    values_matrix = np.nan_to_num(
+        np.array([samples_soa[nut.lower()] for nut in nutrients], dtype=float).reshape(m, n)
+    )
 
     # Variables:
     # x_i (n samples)
@@ -217,51 +266,27 @@ def get_closest_feasible_targets(samples, total_bags, targets_dict, fixed_sample
     c = np.zeros(total_vars)
     c[n:] = 1  # minimize total deviation
 
-    bounds = [(0, bl) for bl in bag_limits] + [(0, None)] * (2 * m)
-
-    # Equality: sum(x) = total_bags
-    A_eq = np.zeros((1, total_vars))
-    A_eq[0, :n] = 1
-    b_eq = np.array([total_bags])
+    bounds = _bounds(bag_limits, 2 * m)
 
     fixed_samples = fixed_samples or {}
 
+    # Equality: sum(x) = total_bags, plus each fixed group
+    fixed_groups = []
     for key, val in fixed_samples.items():
-        if key.upper() == "F/M":
-            matching_indices = [i for i, s in enumerate(samples) if "FISH MEAL" in s.name.upper()]
-        elif key.upper() == "HYPRO":
-            matching_indices = [i for i, s in enumerate(samples) if "HYPRO" in s.name.upper()]
-        else:
-            matching_indices = [i for i, s in enumerate(samples) if key.upper() in s.name.upper()]
+        matching_indices = match_sample_indices(key, samples_soa["upper_names"])
 
         if matching_indices:
-            row = np.zeros(total_vars)
-            for i in matching_indices:
-                row[i] = 1
-            A_eq = np.vstack((A_eq, row))
-            b_eq = np.append(b_eq, val)
-
-    A_ub = []
-    b_ub = []
-
-    for j, nutrient in enumerate(nutrients):
-        target = targets_dict[nutrient]
-
-        row_upper = np.zeros(total_vars)
-        row_upper[:n] = values_matrix[j]
-        row_upper[n + j] = -1
-        A_ub.append(row_upper)
-        b_ub.append(target * total_bags)
-
-        row_lower = np.zeros(total_vars)
-        row_lower[:n] = -values_matrix[j]
-        row_lower[n + m + j] = -1
-        A_ub.append(row_lower)
-        b_ub.append(-target * total_bags)
+            fixed_groups.append((matching_indices, val))
+
+    A_eq, b_eq = _equality_constraints(n, total_vars, fixed_groups, total_bags)
+
+    # Deviation above / below each target
+    target_values = np.array([targets_dict[nut] for nut in nutrients], dtype=float)
+    A_ub, b_ub = _soft_nutrient_constraints(values_matrix, target_values, target_values, total_bags)
 
     res = linprog(c,
-                  A_ub=np.array(A_ub),
-                  b_ub=np.array(b_ub),
+                  A_ub=A_ub,
+                  b_ub=b_ub,
                   A_eq=A_eq,
                   b_eq=b_eq,
                   bounds=bounds,
@@ -272,10 +297,6 @@ def get_closest_feasible_targets(samples, total_bags, targets_dict, fixed_sample
 
     x = res.x[:n]
 
-    # Calculate final achievable nutrient values
-    recommended = {}
-    for j, nutrient in enumerate(nutrients):
-        total = sum(values_matrix[j][i] * x[i] for i in range(n))
-        recommended[nutrient] = round(total / total_bags, 2)
-
-    return recommended
+    # Calculate final achievable nutrient values (one matrix-vector product for all nutrients)
+    achieved = values_matrix @ x / total_bags
+    return {nutrient: round(float(value), 2) for nutrient, value in zip(nutrients, achieved)}
@@ -1,23 +1,102 @@
+import json
+import os
+from functools import lru_cache
+
 import pandas as pd
-from django.http import HttpResponse
-from rest_framework import viewsets
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from rest_framework import mixins, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.views import APIView
 import cloudinary.uploader
 from rest_framework.viewsets import ModelViewSet
 
 from mixengine.models import ProductOrder, Sample, ProductMixResult
 from mixengine.serializers import ProductOrderSerializer, ProductOrderCreateSerializer, ProductMixResultSerializer, \
-    SampleSerializer, ProductOrderDetailSerializer
-from mixengine.tasks import process_sample_upload
-from utility.pagination import SamplePagination
+    SampleSerializer, ProductOrderMixSerializer
+from mixengine.tasks import process_sample_upload, REQUIRED_COLUMNS
+from utility.pagination import SamplePagination, OrderCursorPagination, MixResultCursorPagination
+
+
+# Optional: Add a few example rows to help users
+TEMPLATE_EXAMPLE_DATA = [
+    {
+        'Sample': 'Fish Meal Local',
+        'Date': '23.12.2025',  # format: DD.MM.YYYY
+        'Lot.No': 'FM-2025-001',
+        'M': 10.2,  # Moisture
+        'CP': 64.5,  # Crude Protein
+        'FAT': 11.8,
+        'TVBN': 135.0,
+        'Ash': 19.5,
+        'FFA': 9.2,
+        'Bags': 80,
+        'Fiber': 1.8
+    },
+    {
+        'Sample': 'Hypro Fish',
+        'Date': '20.12.2025',
+        'Lot.No': 'HYPRO-DEC01',
+        'M': 9.8,
+        'CP': 70.0,
+        'FAT': 15.0,
+        'TVBN': 100.0,
+        'Ash': 16.0,
+        'FFA': 5.0,
+        'Bags': 50,
+        'Fiber': 1.0
+    },
+    # Add more examples if you want, or leave empty
+]
+
+
+@lru_cache(maxsize=None)
+def _sample_template_csv():
+    """
+    The upload template never changes, so it is rendered to CSV bytes once per process.
+    Columns are the ones process_sample_upload requires, in the same order.
+    """
+    df = pd.DataFrame(TEMPLATE_EXAMPLE_DATA, columns=REQUIRED_COLUMNS)
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def _stream_json_array(objects, serializer_class):
+    """
+    Serialize objects one at a time into a JSON array, yielding it piece by piece.
+    """
+    yield '['
+    for i, obj in enumerate(objects):
+        yield (',' if i else '') + json.dumps(serializer_class(obj).data, cls=JSONEncoder)
+    yield ']'
+
+
+def _sniff_upload_type(file):
+    """
+    'xlsx' or 'csv' judged from the file's leading bytes (the filename is not trusted), None otherwise.
+    xlsx is a zip archive; csv must look like UTF-8 text.
+    """
+    head = file.read(2048)
+    file.seek(0)
+    if head.startswith(b'PK\x03\x04'):
+        return 'xlsx'
+    if b'\x00' in head:
+        return None
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # tolerate a multi-byte character cut off at the end of the sample
+        if e.start < len(head) - 3:
+            return None
+    return 'csv'
 
 
 class SampleViewSet(ModelViewSet):
-    queryset = Sample.objects.all().order_by('-last_updated')
+    queryset = Sample.objects.defer('name_upper').order_by('-last_updated')  # name_upper is not serialized
     serializer_class = SampleSerializer
     pagination_class = SamplePagination
 
@@ -28,29 +107,45 @@ class SampleViewSet(ModelViewSet):
     ordering_fields = ['name', 'cp', 'last_updated']
 
 
-class ProductOrderViewSet(viewsets.ViewSet):
+class ProductOrderViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
+                          mixins.DestroyModelMixin, viewsets.GenericViewSet):
     """
     Handles:
-    - GET /api/orders/         -> List all orders
+    - GET /api/orders/         -> List orders (cursor-paginated, newest first)
     - GET /api/orders/{id}/    -> Retrieve single order
     - POST /api/orders/optimize/ -> Custom action to optimize mix
     - PATCH /api/orders/{id}/  -> Update an order (target_cp or total_bags)
     - DELETE /api/orders/{id}/ -> Delete an order
     """
     permission_classes = [IsAuthenticated, ]
+    serializer_class = ProductOrderSerializer
+    pagination_class = OrderCursorPagination
+    http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']  # no full PUT
 
-    def list(self, request):
-        orders = ProductOrder.objects.all().order_by('-created_at')
-        serializer = ProductOrderSerializer(orders, many=True)
-        return Response(serializer.data)
-
-    def retrieve(self, request, pk=None):
+    def get_queryset(self):
+        """
+        list: only the columns ProductOrderSerializer renders (plus created_at for the cursor),
+        skipping the JSON targets/final_values/variances. Derived from the serializer so the two stay in sync.
+        retrieve: orders with their mix rows and each row's sample loaded up front
+        (one prefetch query joined to Sample), for the detail serializer.
+        """
+        if self.action == 'list':
+            return ProductOrder.objects.only(*ProductOrderSerializer.Meta.fields, 'created_at')
+        if self.action == 'retrieve':
+            return ProductOrder.objects.prefetch_related(
+                Prefetch('mix', queryset=ProductMixResult.objects.select_related('sample'))
+            )
+        return ProductOrder.objects.all()
+
+    def get_object(self):
         try:
-            order = ProductOrder.objects.get(pk=pk)
-        except ProductOrder.DoesNotExist:
-            return Response({"error": "Order not found"}, status=404)
+            return super().get_object()
+        except Http404:
+            raise NotFound({"error": "Order not found"})
 
-        serializer = ProductOrderDetailSerializer(order)
+    def retrieve(self, request, *args, **kwargs):
+        order = self.get_object()
+        serializer = ProductOrderMixSerializer(order)
 
         return Response({
             "order_id": order.id,
@@ -61,26 +156,6 @@ class ProductOrderViewSet(viewsets.ViewSet):
             "mix": serializer.data["mix"],
         })
 
-    def partial_update(self, request, pk=None):
-        try:
-            order = ProductOrder.objects.get(pk=pk)
-        except ProductOrder.DoesNotExist:
-            return Response({"error": "Order not found"}, status=404)
-
-        serializer = ProductOrderSerializer(order, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=400)
-
-    def destroy(self, request, pk=None):
-        try:
-            order = ProductOrder.objects.get(pk=pk)
-            order.delete()
-            return Response({"message": "Order deleted successfully."}, status=204)
-        except ProductOrder.DoesNotExist:
-            return Response({"error": "Order not found"}, status=404)
-
     @action(detail=False, methods=['post'], url_path='optimize')
     def optimize(self, request):
         """
@@ -101,8 +176,9 @@ class ProductMixResultViewSet(viewsets.ModelViewSet):
     Provides endpoints for listing, retrieving, creating, updating, and deleting
     ProductMixResult instances, which represent the optimized sample mix for a product order.
     """
-    queryset = ProductMixResult.objects.all()
+    queryset = ProductMixResult.objects.select_related('sample').defer('sample__name_upper')  # not serialized
     serializer_class = ProductMixResultSerializer
+    pagination_class = MixResultCursorPagination
 
     permission_classes = [IsAuthenticated]  # Restrict access to authenticated users
 
@@ -117,6 +193,20 @@ class ProductMixResultViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(order__id=order_id)
         return queryset
 
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Unpaginated export of all (optionally order-filtered) mix results as a JSON array.
+        Example: GET /api/mix-results/export/?order_id=2
+        Rows are read with iterator() (a server-side cursor on Postgres) and streamed,
+        so memory stays bounded however many rows there are.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by('-id').iterator(chunk_size=2000)
+        return StreamingHttpResponse(
+            _stream_json_array(queryset, self.get_serializer_class()),
+            content_type='application/json'
+        )
+
 
 class SampleUploadView(APIView):
     """
@@ -130,55 +220,9 @@ class SampleUploadView(APIView):
         """
         Download a template CSV file with required columns and example rows
         """
-        # Define the required columns in exact order
-        columns = [
-            'Sample', 'Date', 'Lot.No', 'M', 'CP', 'FAT',
-            'TVBN', 'Ash', 'FFA', 'Bags', 'Fiber'
-        ]
-
-        # Optional: Add a few example rows to help users
-        example_data = [
-            {
-                'Sample': 'Fish Meal Local',
-                'Date': '23.12.2025',  # format: DD.MM.YYYY
-                'Lot.No': 'FM-2025-001',
-                'M': 10.2,  # Moisture
-                'CP': 64.5,  # Crude Protein
-                'FAT': 11.8,
-                'TVBN': 135.0,
-                'Ash': 19.5,
-                'FFA': 9.2,
-                'Bags': 80,
-                'Fiber': 1.8
-            },
-            {
-                'Sample': 'Hypro Fish',
-                'Date': '20.12.2025',
-                'Lot.No': 'HYPRO-DEC01',
-                'M': 9.8,
-                'CP': 70.0,
-                'FAT': 15.0,
-                'TVBN': 100.0,
-                'Ash': 16.0,
-                'FFA': 5.0,
-                'Bags': 50,
-                'Fiber': 1.0
-            },
-            # Add more examples if you want, or leave empty
-        ]
-
-        # Create DataFrame
-        df = pd.DataFrame(example_data, columns=columns)
-
-        # If you want completely empty (just headers), use:
-        # df = pd.DataFrame(columns=columns)
-
-        # Create HTTP response with CSV
-        response = HttpResponse(content_type='text/csv')
+        response = HttpResponse(_sample_template_csv(), content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="sample_upload_template.csv"'
-
-        df.to_csv(path_or_buf=response, index=False, encoding='utf-8')
-
+        response['Cache-Control'] = 'public, max-age=86400'
         return response
 
     def post(self, request):
@@ -190,11 +234,19 @@ class SampleUploadView(APIView):
         if file.size > MAX_UPLOAD_SIZE:
             return Response({"error": "File too large"}, status=400)
 
-        # Upload to Cloudinary as RAW file
-        upload_result = cloudinary.uploader.upload(
+        # Reject before uploading: the worker picks its parser from the extension
+        extension = os.path.splitext(file.name)[1].lower().lstrip('.')
+        if extension not in ('csv', 'xlsx') or _sniff_upload_type(file) != extension:
+            return Response({"error": "Unsupported file type. Upload a .csv or .xlsx file."}, status=400)
+
+        # Upload to Cloudinary as RAW file, sent in 6 MB parts read straight from the upload
+        # (uploads above FILE_UPLOAD_MAX_MEMORY_SIZE are already spooled to disk by Django)
+        upload_result = cloudinary.uploader.upload_large(
             file,
+            filename=file.name,
             resource_type="raw",
-            folder="mixengine_uploads"
+            folder="mixengine_uploads",
+            chunk_size=6_000_000
         )
 
         file_url = upload_result["secure_url"]
@@ -1,7 +1,22 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 
 
 class SamplePagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination for the order history: pages are fetched with a WHERE on
+    created_at instead of an OFFSET, so deep pages cost the same as the first one.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+
+
+class MixResultCursorPagination(OrderCursorPagination):
+    ordering = '-id'  # ProductMixResult has no timestamp; ids grow with creation